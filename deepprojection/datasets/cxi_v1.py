@@ -4,7 +4,6 @@
 import torch
 import numpy as np
 import random
-import json
 import csv
 import h5py
 import os
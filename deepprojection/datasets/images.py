@@ -6,6 +6,7 @@ import psana
 import numpy as np
 import random
 import csv
+import functools
 import os
 import logging
 
@@ -60,12 +61,17 @@ class SPIImgDataset(Dataset):
         self.psana_imgreader_dict = {}
         self.imglabel_orig_list   = []
         self.imglabel_cache_dict  = {}
+        self.imagesize_cache_dict = {}
         self.is_cache             = False
 
         # Set the seed...
         # Debatable whether seed should be set in the dataset or in the running code
         if not self.seed is None: set_seed(self.seed)
 
+        # Set up a local random stream...
+        # Dataloader workers get an independent stream through worker_init_fn
+        self.rng = np.random.default_rng(self.seed)
+
         # Read csv file of datasets...
         with open(fl_csv, 'r') as fh:
             lines = csv.reader(fh)
@@ -82,7 +88,11 @@ class SPIImgDataset(Dataset):
                 basename = (exp, run)
 
                 # Initiate image accessing layer...
-                psana_imgreader = PsanaImg(exp, run, mode, detector_name)
+                # A prebuilt memmap image bank next to the label files takes
+                # precedence over going through psana
+                path_mmap = os.path.join(drc_label, f"{exp}_{int(run):04d}.mmap")
+                psana_imgreader = MemmapImg(path_mmap) if MemmapImg.exists(path_mmap) else \
+                                  PsanaImg(exp, run, mode, detector_name)
                 self.psana_imgreader_dict[basename] = psana_imgreader
 
                 # Obtain image labels from this dataset...
@@ -119,6 +129,41 @@ class SPIImgDataset(Dataset):
         if self.dataset_usage in dataset_by_usage_dict:
             self.imglabel_list = dataset_by_usage_dict[self.dataset_usage]
 
+        # Build the columnar index over the chosen list...
+        self._build_soa_index()
+
+        return None
+
+
+    def _build_soa_index(self):
+        ''' Build columnar arrays over imglabel_list for hot-path lookups.
+
+            imglabel_list remains the source of truth for metadata and titles.
+            The arrays let get_img_and_label do one gather per field instead of
+            unpacking a tuple of strings and re-coercing them per fetch.
+        '''
+        basename_to_idx      = {}
+        self.basename_by_idx = []
+        dataset_idx_list     = []
+        event_num_list       = []
+        label_list           = []
+
+        for exp, run, event_num, label in self.imglabel_list:
+            basename = (exp, run)
+
+            # Track each distinct (exp, run) once...
+            if not basename in basename_to_idx:
+                basename_to_idx[basename] = len(self.basename_by_idx)
+                self.basename_by_idx.append(basename)
+
+            dataset_idx_list.append(basename_to_idx[basename])
+            event_num_list.append(int(event_num))
+            label_list.append(int(label))
+
+        self.dataset_idx_arr = np.asarray(dataset_idx_list, dtype = np.int64)
+        self.event_num_arr   = np.asarray(event_num_list  , dtype = np.int64)
+        self.label_arr       = np.asarray(label_list      , dtype = np.int32)
+
         return None
 
 
@@ -144,23 +189,91 @@ class SPIImgDataset(Dataset):
 
 
     def get_img_and_label(self, idx, verbose = False):
-        # Read image...
-        exp, run, event_num, label = self.imglabel_list[idx]
-        basename = (exp, run)
-        img = self.psana_imgreader_dict[basename].get(int(event_num), mode = self.mode)
+        # Read image through the columnar index, one gather per field...
+        basename  = self.basename_by_idx[self.dataset_idx_arr[idx]]
+        event_num = int(self.event_num_arr[idx])
+        label     = int(self.label_arr[idx])
+        img = self.psana_imgreader_dict[basename].get(event_num, mode = self.mode)
 
-        if verbose: logger.info(f'DATA LOADING - {exp} {run} {event_num} {label}.')
+        if verbose: logger.info(f'DATA LOADING - {basename[0]} {basename[1]} {event_num} {label}.')
 
         return img, label
 
 
-    def __getitem__(self, idx):
-        img, label = self.imglabel_cache_dict[idx] if   idx in self.imglabel_cache_dict \
-                                                   else self.get_img_and_label(idx)
+    def get_imagesize(self, idx):
+        ''' Return the (size_y, size_x) of an image, memoized per dataset.
+
+            Decoding a whole image just to learn its shape is expensive, so the
+            shape is cached per (exp, run) after the first decode.
+        '''
+        basename = self.basename_by_idx[self.dataset_idx_arr[idx]]
+
+        if not basename in self.imagesize_cache_dict:
+            img, _ = self.get_img_and_label(idx)
+            self.imagesize_cache_dict[basename] = img.shape
+
+        return self.imagesize_cache_dict[basename]
+
+
+    def get_imgs_and_labels(self, idx_list, verbose = False):
+        ''' Batched variant of get_img_and_label.
+
+            Indices are grouped by dataset so each reader is entered once per
+            group instead of once per image.
+        '''
+        # Group positions in idx_list by the dataset they read from...
+        group_dict = {}
+        for pos, idx in enumerate(idx_list):
+            basename = self.basename_by_idx[self.dataset_idx_arr[idx]]
+            if not basename in group_dict: group_dict[basename] = [pos]
+            else                         : group_dict[basename].append(pos)
+
+        # Read each group with one batched call...
+        imgs = [ None for _ in idx_list ]
+        for basename, pos_list in group_dict.items():
+            event_nums = [ int(self.event_num_arr[idx_list[pos]]) for pos in pos_list ]
+            img_stack  = self.psana_imgreader_dict[basename].get_many(event_nums, mode = self.mode)
+
+            for pos, img in zip(pos_list, img_stack):
+                imgs[pos] = img
+
+                if verbose:
+                    exp, run = basename
+                    logger.info(f'DATA LOADING - {exp} {run} {int(self.event_num_arr[idx_list[pos]])} {int(self.label_arr[idx_list[pos]])}.')
+
+        labels = [ int(self.label_arr[idx]) for idx in idx_list ]
+
+        return list(zip(imgs, labels))
 
+
+    def getitems(self, idx_list):
+        ''' Fetch multiple items at a time.
+
+            Uncached images are read through one batched fetch rather than one
+            reader round trip each.
+        '''
+        # Split cached from uncached...
+        idx_uncached = [ idx for idx in idx_list if not idx in self.imglabel_cache_dict ]
+
+        # Read all uncached images in one batched call...
+        imglabel_uncached_dict = {}
+        for idx, imglabel in zip(idx_uncached, self.get_imgs_and_labels(idx_uncached)):
+            imglabel_uncached_dict[idx] = imglabel
+
+        # Assemble results in the requested order...
+        res = []
+        for idx in idx_list:
+            img, label = self.imglabel_cache_dict[idx] if   idx in self.imglabel_cache_dict \
+                                                       else imglabel_uncached_dict[idx]
+            res.append( (self._postprocess_img(img), label) )
+
+        return res
+
+
+    def _postprocess_img(self, img):
         # Apply any possible transformation...
         # How to define a custom transform function?
-        # Input : img, **kwargs 
+        # Input : img, **kwargs
         # Output: img_transfromed
         if self.trans is not None:
             img = self.trans(img)
@@ -171,9 +284,21 @@ class SPIImgDataset(Dataset):
         img_norm = (img - img_mean) / img_std
 
         # If not flat, add one extra dimension to reflect the number channels...
-        img_norm = img_norm[np.newaxis,] if not self.isflat else img_norm.reshape(-1)
+        # Normalization above produced a fresh contiguous array, so ravel and
+        # the tensor conversion below are zero-copy views
+        img_norm = img_norm[np.newaxis,] if not self.isflat else img_norm.ravel()
+
+        # Tensorize here so the collate step doesn't redo it in the main
+        # process; pinning is left to the loader's pin_memory=True, which
+        # pins the collated batch once instead of every sample
+        return torch.from_numpy(img_norm).float()
+
+
+    def __getitem__(self, idx):
+        img, label = self.imglabel_cache_dict[idx] if   idx in self.imglabel_cache_dict \
+                                                   else self.get_img_and_label(idx)
 
-        return img_norm, int(label)
+        return self._postprocess_img(img), label
 
 
 
@@ -184,14 +309,20 @@ class Siamese(SPIImgDataset):
         super().__init__(config)
 
         # Create a lookup table for locating the sequence number (seqi) based on a label...
-        label_seqi_dict = {}
-        for seqi, (_, _, _, label) in enumerate(self.imglabel_list):
-            # Keep track of label and its seqi
-            if not label in label_seqi_dict: label_seqi_dict[label] = [seqi]
-            else                           : label_seqi_dict[label].append(seqi)
+        # A stable argsort over labels groups each label's seqis contiguously,
+        # replacing the per-entry Python append loop with native numpy ops
+        label_arr    = np.array([ i[-1] for i in self.imglabel_list ])
+        order        = np.argsort(label_arr, kind = 'stable')
+        label_sorted = label_arr[order]
+
+        uniques, starts = np.unique(label_sorted, return_index = True)
+        ends            = np.append(starts[1:], len(order))
+
+        label_seqi_dict = { label : order[start : end]
+                            for label, start, end in zip(uniques.tolist(), starts, ends) }
 
         # Consolidate labels in the dataset...
-        self.labels = sorted(list(set([ i[-1] for i in self.imglabel_list ])))
+        self.labels = uniques.tolist()
 
         # Log the number of images for each label...
         logger.info("___/ Dataset statistics \___")
@@ -199,7 +330,14 @@ class Siamese(SPIImgDataset):
             num_img = len(label_seqi_dict[label])
             logger.info(f"KV - {label:16s} : {num_img}")
 
-        self.label_seqi_dict = { k : v for k, v in sorted(label_seqi_dict.items(), key=lambda item: item[0]) }
+        # Keep buckets as numpy arrays so sampling is a single integer draw...
+        self.label_seqi_dict = { k : np.asarray(v, dtype = np.int64)
+                                 for k, v in sorted(label_seqi_dict.items(), key=lambda item: item[0]) }
+
+        # Precompute the complement bucket (all seqis not under a label) for negative sampling...
+        all_seqi = np.arange(len(self.imglabel_list), dtype = np.int64)
+        self.neg_seqi_dict = { label : np.setdiff1d(all_seqi, pos_bucket, assume_unique = True)
+                               for label, pos_bucket in self.label_seqi_dict.items() }
 
         return None
 
@@ -232,10 +370,9 @@ class SiameseDataset(Siamese):
     def __getitem__(self, idx):
         id_anchor, id_pos, id_neg = self.triplets[idx]
 
-        # Read the anchor, pos, neg
-        img_anchor, label_anchor = super().__getitem__(id_anchor)
-        img_pos, _ = super().__getitem__(id_pos)
-        img_neg, _ = super().__getitem__(id_neg)
+        # Read the anchor, pos, neg in one batched fetch...
+        (img_anchor, label_anchor), (img_pos, _), (img_neg, _) = \
+            self.getitems((id_anchor, id_pos, id_neg))
 
         res = img_anchor, img_pos, img_neg, label_anchor
 
@@ -255,36 +392,29 @@ class SiameseDataset(Siamese):
         The anchor label is sampled from a set of labels, which ensures that
         the triplets don't have a favored combination.  
         """
-        size_sample       = self.size_sample
-        label_anchor_list = random.choices(self.labels, k = size_sample)
-
-        # Collection of triplets...
-        triplets = []
-        for label_anchor in label_anchor_list:
-            # Fetch the anchor label...
-            # Create buckets of anchors...
-            anchor_bucket = label_seqi_dict[label_anchor]
-
-            # Randomly sample one anchor...
-            id_anchor = random.choice(anchor_bucket)
-
-            # Create buckets of positives according to the anchor...
-            pos_bucket = anchor_bucket
-
-            # Randomly sample one positive...
-            id_pos = random.choice(pos_bucket)
+        size_sample = self.size_sample
+        labels      = self.labels
 
-            # Create buckets of negatives according to the anchor...
-            neg_labels = [ label for label in self.labels if label != label_anchor ]
-            neg_label  = random.choice(neg_labels)
-            neg_bucket = label_seqi_dict[neg_label]
+        # Draw all anchor labels in one call...
+        label_idx_list = self.rng.integers(len(labels), size = size_sample)
 
-            # Randomly sample one negative...
-            id_neg = random.choice(neg_bucket)
+        # Flatten the per-label buckets so drawing a component is one gather...
+        pos_sizes   = np.array([ len(label_seqi_dict[label])    for label in labels ], dtype = np.int64)
+        neg_sizes   = np.array([ len(self.neg_seqi_dict[label]) for label in labels ], dtype = np.int64)
+        flat_pos    = np.concatenate([ label_seqi_dict[label]    for label in labels ])
+        flat_neg    = np.concatenate([ self.neg_seqi_dict[label] for label in labels ])
+        pos_offsets = np.cumsum(pos_sizes) - pos_sizes
+        neg_offsets = np.cumsum(neg_sizes) - neg_sizes
 
-            triplets.append( (id_anchor, id_pos, id_neg) )
+        # Scale one bulk uniform draw per component by each anchor's bucket size...
+        id_anchor_list = flat_pos[ pos_offsets[label_idx_list] +
+                                   (self.rng.random(size_sample) * pos_sizes[label_idx_list]).astype(np.int64) ]
+        id_pos_list    = flat_pos[ pos_offsets[label_idx_list] +
+                                   (self.rng.random(size_sample) * pos_sizes[label_idx_list]).astype(np.int64) ]
+        id_neg_list    = flat_neg[ neg_offsets[label_idx_list] +
+                                   (self.rng.random(size_sample) * neg_sizes[label_idx_list]).astype(np.int64) ]
 
-        return triplets
+        return list(zip(id_anchor_list.tolist(), id_pos_list.tolist(), id_neg_list.tolist()))
 
 
 
@@ -343,7 +473,7 @@ class SiameseTestset(Siamese):
         # Select two list of random labels following uniform distribution...
         # For anchor
         size_sample       = self.size_sample
-        label_anchor_list = random.choices(self.labels, k = size_sample)
+        label_anchor_list = self.rng.choice(self.labels, size = size_sample)
 
         # Collection of doublets...
         doublets = []
@@ -353,15 +483,15 @@ class SiameseTestset(Siamese):
             anchor_bucket = label_seqi_dict[label_anchor]
 
             # Randomly sample one anchor...
-            id_anchor = random.choice(anchor_bucket)
+            id_anchor = self.rng.choice(anchor_bucket)
 
             # Create buckets of second images...
-            label_second = random.choice(self.labels)
+            label_second = self.rng.choice(self.labels)
 
             second_bucket = label_seqi_dict[label_second]
 
             # Randomly sample one second image...
-            id_second = random.choice(second_bucket)
+            id_second = self.rng.choice(second_bucket)
 
             doublets.append( (id_anchor, id_second) )
 
@@ -423,7 +553,7 @@ class MultiwayQueryset(Siamese):
         # Select two list of random labels following uniform distribution...
         # For queryed image
         size_sample       = self.size_sample
-        label_query_list = random.choices(self.labels, k = size_sample)
+        label_query_list = self.rng.choice(self.labels, size = size_sample)
 
         # Form a queryset...
         queryset = []
@@ -432,7 +562,7 @@ class MultiwayQueryset(Siamese):
             query_bucket = label_seqi_dict[label_query]
 
             # Randomly sample one query...
-            id_query = random.choice(query_bucket)
+            id_query = self.rng.choice(query_bucket)
 
             # Find a test image from each label...
             ids_test = []
@@ -441,7 +571,7 @@ class MultiwayQueryset(Siamese):
                 test_bucket = label_seqi_dict[label_test]
 
                 # Randomly sample one test image...
-                id_test = random.choice(test_bucket)
+                id_test = self.rng.choice(test_bucket)
                 ids_test.append(id_test)
 
             # Combine the query id with test ids...
@@ -453,6 +583,31 @@ class MultiwayQueryset(Siamese):
 
 
 
+@functools.lru_cache(maxsize = None)
+def _read_labelfile(path_labelfile):
+    ''' Read a psocake label csv once per path.
+
+        Parsers instantiated for the same (exp, run) share the parsed rows
+        instead of re-reading and re-tokenizing the file.  Thread-safe under
+        the GIL; the returned tuple is immutable.
+    '''
+    imglabel_list = []
+    with open(path_labelfile, 'r') as fh:
+        lines = csv.reader(fh)
+
+        # Skip the header
+        next(lines)
+
+        for line in lines:
+            # Fetch metadata of a dataset
+            _, _, event_num, label = line
+            imglabel_list.append( (event_num, label) )
+
+    return tuple(imglabel_list)
+
+
+
+
 class ImgLabelFileParser:
     """
     It parses a label file associated with a run in an experiment.  The label 
@@ -500,24 +655,19 @@ class ImgLabelFileParser:
         # Read, sort and index labels
         imglabel_dict = {}
         if os.path.exists(self.path_labelfile):
-            # Read csv file of datasets
-            with open(self.path_labelfile, 'r') as fh:
-                lines = csv.reader(fh)
-
-                # Skip the header
-                next(lines)
-
-                # Read each line/dataset
-                for line in lines:
-                    # Fetch metadata of a dataset 
-                    _, _, event_num, label = line
-                    imglabel_dict[event_num] = label
+            # Read the label file, shared across parsers of the same path...
+            for event_num, label in _read_labelfile(self.path_labelfile):
+                imglabel_dict[event_num] = label
 
             # Exclude some labels
             imglabel_dict = { k:v for k, v in imglabel_dict.items() if not v in self.exclude_labels }
 
-            # Sort label
-            self.imglabel_dict = dict( sorted( imglabel_dict.items(), key = lambda x:int(x[0]) ) )
+            # Sort by event number with a native argsort instead of a Python key function...
+            event_keys = list(imglabel_dict.keys())
+            event_nums = np.fromiter( (int(k) for k in event_keys), dtype = np.int64, count = len(event_keys) )
+            order      = np.argsort(event_nums, kind = 'stable')
+
+            self.imglabel_dict = { event_keys[i] : imglabel_dict[event_keys[i]] for i in order }
 
         return None
 
@@ -530,7 +680,7 @@ class PsanaImg:
     psana in LCLS.  
     """
 
-    def __init__(self, exp, run, mode, detector_name):
+    def __init__(self, exp, run, mode, detector_name, cachesize = 2048):
         # Biolerplate code to access an image
         # Set up data source
         self.datasource_id = f"exp={exp}:run={run}:{mode}"
@@ -541,10 +691,66 @@ class PsanaImg:
         # Set up detector
         self.detector = psana.Detector(detector_name)
 
+        # Set up a per-process cache of decoded images...
+        # Dataloader workers are separate processes, thus each worker owns its
+        # cache and no locking is required
+        self._get_cached = functools.lru_cache(maxsize = cachesize)(self._get_uncached)
+
 
     def get(self, event_num, mode = "image"):
+        # Copy on the way out so in-place transforms downstream (e.g. img *=
+        # mask) cannot mutate the cached decode
+        return self._get_cached(int(event_num), mode).copy()
+
+
+    def get_many(self, event_nums, mode = "image"):
+        ''' Fetch a batch of events with one call.
+
+            Amortizes the per-event Python dispatch; events already decoded
+            come straight out of the cache.
+        '''
+        return np.stack([ self.get(event_num, mode = mode) for event_num in event_nums ])
+
+
+    def preload(self, event_nums, mode = "image"):
+        ''' Populate the cache eagerly with user specified events.
+        '''
+        for event_num in event_nums:
+            self.get(event_num, mode = mode)
+
+        return None
+
+
+    def dump_to_memmap(self, path, event_nums, mode = "image", dtype = np.float32):
+        ''' Write the requested events to a flat memmapped image bank.
+
+            A one-shot offline pass trades the per-event psana decode for mmap
+            row reads that the OS page-caches across epochs.  A sidecar meta
+            file records the event numbers, image shape and dtype needed to
+            reopen the bank through MemmapImg.
+        '''
+        # Learn the image shape from the first event...
+        img_first = self.get(event_nums[0], mode = mode)
+
+        # Iterate events once and write each decoded image to its row...
+        mm = np.memmap(path, dtype = dtype, mode = 'w+', shape = (len(event_nums), ) + img_first.shape)
+        for i, event_num in enumerate(event_nums):
+            mm[i] = self.get(event_num, mode = mode)
+        mm.flush()
+
+        np.savez( f"{path}.meta.npz",
+                  event_nums = np.asarray(event_nums, dtype = np.int64),
+                  shape      = np.asarray(img_first.shape, dtype = np.int64),
+                  dtype      = str(np.dtype(dtype)),
+                  mode       = mode, )
+
+        return None
+
+
+    def _get_uncached(self, event_num, mode = "image"):
         # Fetch the timestamp according to event number...
-        timestamp = self.timestamps[int(event_num)]
+        # event_num is already an int, coerced once at the get() boundary
+        timestamp = self.timestamps[event_num]
 
         # Access each event based on timestamp...
         event = self.run_current.event(timestamp)
@@ -556,7 +762,55 @@ class PsanaImg:
         read = { "image" : self.detector.image, }
         img = read[mode](event)
 
-        return img
+        # Make the cached copy contiguous once so later ravel/from_numpy are zero-copy...
+        return np.ascontiguousarray(img)
+
+
+
+
+class MemmapImg:
+    """
+    It serves as an image accessing layer based on a flat memmapped image bank
+    written by PsanaImg.dump_to_memmap.  It exposes the same get/get_many API
+    as PsanaImg, but a fetch is a direct mmap row read that the OS page-caches
+    across epochs instead of a psana decode.
+    """
+
+    def __init__(self, path):
+        meta       = np.load(f"{path}.meta.npz")
+        event_nums = meta['event_nums']
+        shape      = tuple(meta['shape'])
+        dtype      = np.dtype(str(meta['dtype']))
+
+        self.path = path
+        # Banks predating the mode field were always dumped in image mode...
+        self.mode = str(meta['mode']) if 'mode' in meta.files else 'image'
+        self._mm  = np.memmap(path, dtype = dtype, mode = 'r', shape = (len(event_nums), ) + shape)
+
+        # Map event number to its row in the bank...
+        self._row_by_event = { int(event_num) : row for row, event_num in enumerate(event_nums) }
+
+
+    @staticmethod
+    def exists(path):
+        ''' Report whether a bank (data plus sidecar meta) is present.
+        '''
+        return os.path.exists(path) and os.path.exists(f"{path}.meta.npz")
+
+
+    def get(self, event_num, mode = "image"):
+        # The bank only holds events decoded in one mode; serving another
+        # would silently return the wrong data
+        assert mode == self.mode, f"Mode {mode} is not in this bank!!!  It was dumped in mode {self.mode}."
+
+        # Copy into a writable array: the bank is opened read-only and
+        # in-place transforms downstream (e.g. img *= mask) would raise on a
+        # view; copying also keeps callers from aliasing the shared bank
+        return np.array(self._mm[self._row_by_event[int(event_num)]])
+
+
+    def get_many(self, event_nums, mode = "image"):
+        return np.stack([ self.get(event_num, mode = mode) for event_num in event_nums ])
 
 
 
@@ -605,7 +859,7 @@ class SimpleSet(Siamese):
         # Select two list of random labels following uniform distribution...
         # For a single image
         size_sample = self.size_sample
-        label_list  = random.choices(self.labels, k = size_sample)
+        label_list  = self.rng.choice(self.labels, size = size_sample)
 
         # Form a simple set...
         simpleset = []
@@ -614,7 +868,7 @@ class SimpleSet(Siamese):
             bucket = label_seqi_dict[label]
 
             # Randomly sample one...
-            id = random.choice(bucket)
+            id = self.rng.choice(bucket)
 
             simpleset.append(id)
 
@@ -635,6 +889,9 @@ class SequentialSet(Siamese):
         # Force imglabel_list to be the original one...
         self.imglabel_list = self.imglabel_orig_list
 
+        # Rebuild the columnar index to follow the reassigned list...
+        self._build_soa_index()
+
         # Create a lookup table for locating the sequence number (seqi) based on a label...
         self.label_seqi_orig_dict = {}
         for seqi, (_, _, _, label) in enumerate(self.imglabel_orig_list):
@@ -707,7 +964,7 @@ class OnlineDataset(Siamese):
         # Select two list of random labels following uniform distribution...
         # For a single image
         size_sample = self.size_sample
-        label_list  = random.choices(self.labels, k = size_sample)
+        label_list  = self.rng.choice(self.labels, size = size_sample)
 
         label_seqi_dict = self.label_seqi_dict
 
@@ -720,7 +977,7 @@ class OnlineDataset(Siamese):
 
                 # Randomly sample certain number of unique examples per class...
                 num_sample = min(self.size_sample_per_class, len(bucket))
-                id_list = random.sample(bucket, num_sample)
+                id_list = self.rng.choice(bucket, num_sample, replace = False)
 
                 label_seqi_sampled_dict[label] = id_list
 
@@ -733,7 +990,7 @@ class OnlineDataset(Siamese):
             bucket = label_seqi_dict[label]
 
             # Randomly sample one...
-            id = random.choice(bucket)
+            id = self.rng.choice(bucket)
 
             online_set.append(id)
 
@@ -547,7 +547,7 @@ class ImgLabelFileParser:
             self.imglabel_dict = dict( sorted( imglabel_dict.items(), key = lambda x:int(x[0]) ) )
 
         else:
-            print(f"File doesn't exist!!! Missing {self.path_labelfile}.")
+            logger.info(f"File doesn't exist!!! Missing {self.path_labelfile}.")
 
         return None
 
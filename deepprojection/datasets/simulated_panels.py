@@ -11,7 +11,6 @@ import psana
 # Load misc modules
 import numpy as np
 import random
-import json
 import csv
 import h5py
 import os
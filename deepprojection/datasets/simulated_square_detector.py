@@ -5,7 +5,6 @@ import torch
 import psana
 import numpy as np
 import random
-import json
 import csv
 import h5py
 import os
@@ -31,24 +31,44 @@ class SiameseModel(nn.Module):
         self.alpha   = config.alpha
         self.encoder = config.encoder
 
+        # Lay out conv weights in channels_last order for Tensor Core friendly kernels...
+        if torch.cuda.is_available():
+            self.encoder = self.encoder.to(memory_format = torch.channels_last)
 
-    def forward(self, img_anchor, img_pos, img_neg):
-        # Encode images...
-        img_anchor_embed = self.encoder.encode(img_anchor)
-        img_pos_embed    = self.encoder.encode(img_pos)
-        img_neg_embed    = self.encoder.encode(img_neg)
 
-        # Calculate the RMSD between anchor and positive...
-        # Well, it's in fact squared distance
-        img_diff = img_anchor_embed - img_pos_embed
-        rmsd_anchor_pos = torch.sum(img_diff * img_diff, dim = -1)
+    def forward(self, img_anchor, img_pos, img_neg):
+        # Match the channels_last layout of the encoder...
+        if img_anchor.is_cuda and img_anchor.dim() == 4:
+            img_anchor = img_anchor.to(memory_format = torch.channels_last)
+            img_pos    = img_pos.to(memory_format = torch.channels_last)
+            img_neg    = img_neg.to(memory_format = torch.channels_last)
+
+        # Encode anchor, pos and neg with one stacked call under fp16 autocast on GPU...
+        # One encoder launch over 3x the batch replaces three small ones
+        img_stacked = torch.cat([img_anchor, img_pos, img_neg], dim = 0)
+        with torch.autocast(device_type = 'cuda', dtype = torch.float16, enabled = img_stacked.is_cuda):
+            emb_stacked = self.encoder.encode(img_stacked)
+        img_anchor_embed, img_pos_embed, img_neg_embed = emb_stacked.chunk(3, dim = 0)
+
+        # Calculate the RMSD between anchor and positive in fp32 to avoid precision loss...
+        # Well, it's in fact squared distance, computed through the expansion
+        # |a - b|^2 = aa + bb - 2ab so the anchor self-term is shared between
+        # the pos and neg distances and no difference tensor is materialized
+        emb_anchor = img_anchor_embed.float()
+        emb_pos    = img_pos_embed.float()
+        emb_neg    = img_neg_embed.float()
+
+        dot_anchor = torch.sum(emb_anchor * emb_anchor, dim = -1)
+
+        rmsd_anchor_pos = ( dot_anchor + torch.sum(emb_pos * emb_pos, dim = -1)
+                                       - 2 * torch.sum(emb_anchor * emb_pos, dim = -1) ).clamp_min(0)
 
         # Calculate the RMSD between anchor and negative...
-        img_diff = img_anchor_embed - img_neg_embed
-        rmsd_anchor_neg = torch.sum(img_diff * img_diff, dim = -1)
+        rmsd_anchor_neg = ( dot_anchor + torch.sum(emb_neg * emb_neg, dim = -1)
+                                       - 2 * torch.sum(emb_anchor * emb_neg, dim = -1) ).clamp_min(0)
 
-        # Calculate the triplet loss, relu is another implementation of max(a, b)...
-        loss_triplet = torch.relu(rmsd_anchor_pos - rmsd_anchor_neg + self.alpha)
+        # Calculate the triplet loss, clamp_min is max(x, 0) in one fusible op...
+        loss_triplet = (rmsd_anchor_pos - rmsd_anchor_neg + self.alpha).clamp_min(0)
 
         return img_anchor_embed, img_pos_embed, img_neg_embed, loss_triplet.mean()
 
@@ -70,8 +90,12 @@ class OnlineSiameseModel(nn.Module):
         self.alpha   = config.alpha
         self.encoder = config.encoder
 
+        # Lay out conv weights in channels_last order for Tensor Core friendly kernels...
+        if torch.cuda.is_available():
+            self.encoder = self.encoder.to(memory_format = torch.channels_last)
 
-    def forward(self, batch_imgs, batch_labels, batch_titles, 
+
+    def forward(self, batch_imgs, batch_labels, batch_titles,
                 is_logging = True, 
                 method = 'semi-hard',
                 shuffle = False):
@@ -93,22 +117,38 @@ class OnlineSiameseModel(nn.Module):
         img_pos    = batch_imgs[ [ triplet[1] for triplet in triplets ] ]
         img_neg    = batch_imgs[ [ triplet[2] for triplet in triplets ] ]
 
-        # Encode images...
-        img_anchor_embed = self.encoder.encode(img_anchor)
-        img_pos_embed    = self.encoder.encode(img_pos)
-        img_neg_embed    = self.encoder.encode(img_neg)
+        # Match the channels_last layout of the encoder...
+        if img_anchor.is_cuda and img_anchor.dim() == 4:
+            img_anchor = img_anchor.to(memory_format = torch.channels_last)
+            img_pos    = img_pos.to(memory_format = torch.channels_last)
+            img_neg    = img_neg.to(memory_format = torch.channels_last)
+
+        # Encode anchor, pos and neg with one stacked call under fp16 autocast on GPU...
+        # One encoder launch over 3x the batch replaces three small ones
+        img_stacked = torch.cat([img_anchor, img_pos, img_neg], dim = 0)
+        with torch.autocast(device_type = 'cuda', dtype = torch.float16, enabled = img_stacked.is_cuda):
+            emb_stacked = self.encoder.encode(img_stacked)
+        img_anchor_embed, img_pos_embed, img_neg_embed = emb_stacked.chunk(3, dim = 0)
 
-        # Calculate the RMSD between anchor and positive...
-        # Well, it's in fact squared distance
-        img_diff = img_anchor_embed - img_pos_embed
-        rmsd_anchor_pos = torch.sum(img_diff * img_diff, dim = -1)
+        # Calculate the RMSD between anchor and positive in fp32 to avoid precision loss...
+        # Well, it's in fact squared distance, computed through the expansion
+        # |a - b|^2 = aa + bb - 2ab so the anchor self-term is shared between
+        # the pos and neg distances and no difference tensor is materialized
+        emb_anchor = img_anchor_embed.float()
+        emb_pos    = img_pos_embed.float()
+        emb_neg    = img_neg_embed.float()
+
+        dot_anchor = torch.sum(emb_anchor * emb_anchor, dim = -1)
+
+        rmsd_anchor_pos = ( dot_anchor + torch.sum(emb_pos * emb_pos, dim = -1)
+                                       - 2 * torch.sum(emb_anchor * emb_pos, dim = -1) ).clamp_min(0)
 
         # Calculate the RMSD between anchor and negative...
-        img_diff = img_anchor_embed - img_neg_embed
-        rmsd_anchor_neg = torch.sum(img_diff * img_diff, dim = -1)
+        rmsd_anchor_neg = ( dot_anchor + torch.sum(emb_neg * emb_neg, dim = -1)
+                                       - 2 * torch.sum(emb_anchor * emb_neg, dim = -1) ).clamp_min(0)
 
-        # Calculate the triplet loss, relu is another implementation of max(a, b)...
-        loss_triplet = torch.relu(rmsd_anchor_pos - rmsd_anchor_neg + self.alpha)
+        # Calculate the triplet loss, clamp_min is max(x, 0) in one fusible op...
+        loss_triplet = (rmsd_anchor_pos - rmsd_anchor_neg + self.alpha).clamp_min(0)
 
         return loss_triplet.mean()
 
@@ -178,79 +218,15 @@ class OnlineSiameseModel(nn.Module):
         with torch.set_grad_enabled(False):
             batch_embs = self.encoder.encode(batch_imgs)
 
-        # Convert batch labels to dictionary for fast lookup...
-        batch_label_dict = {}
-        batch_label_list = batch_labels.cpu().numpy()
-        for i, v in enumerate(batch_label_list):
-            if not v in batch_label_dict: batch_label_dict[v] = [i]
-            else                        : batch_label_dict[v].append(i)
-
-        # ___/ NEGATIVE MINIG \___
-        # Go through each image in the batch and form triplets...
-        # Prepare for logging
-        triplets = []
-        dist_log = []
-        for batch_idx_achr, img in enumerate(batch_imgs):
-            # Get the label of the image...
-            batch_label_achr = batch_label_list[batch_idx_achr]
-
-            # Create a bucket of positive cases...
-            batch_idx_pos_list = batch_label_dict[batch_label_achr]
-
-            # Select a positive case from positive bucket...
-            batch_idx_pos = random.choice(batch_idx_pos_list)
-
-            # Find positive embedding squared distances..
-            emb_achr = batch_embs[batch_idx_achr]
-            emb_pos  = batch_embs[batch_idx_pos]
-            delta_emb_pos = emb_achr - emb_pos
-            dist_pos = torch.sum(delta_emb_pos * delta_emb_pos)
-
-            # Create a bucket of negative cases...
-            idx_neg_list = []
-            for batch_label, idx_list in batch_label_dict.items():
-                if batch_label == batch_label_achr: continue
-                idx_neg_list += idx_list
-            idx_neg_list = torch.tensor(idx_neg_list)
-
-            # Collect all negative embeddings...
-            emb_neg_list = batch_embs[idx_neg_list]
-
-            # Find negative embedding squared distances...
-            delta_emb_neg_list = emb_achr[None, :] - emb_neg_list
-            dist_neg_list = torch.sum( delta_emb_neg_list * delta_emb_neg_list, dim = -1 )
-
-            # Find negative squared distance satisfying dist_neg > dist_pos (semi hard)...
-            # logical_and is only supported when pytorch version >= 1.5
-            ## cond_semihard = torch.logical_and( dist_pos < dist_neg_list, dist_neg_list < dist_pos + self.alpha)
-            cond_semihard = (dist_pos < dist_neg_list) * (dist_neg_list < dist_pos + self.alpha)
-
-            # If semi hard exists???
-            if torch.any(cond_semihard):
-                ## # Look for the argmin...
-                ## min_neg_semihard = torch.min(dist_neg_list[cond_semihard], dim = -1)
-                ## batch_idx_neg    = idx_neg_list[cond_semihard][min_neg_semihard.indices]
-                ## dist_neg = min_neg_semihard.values
-
-                # Select one random example that is semi hard...
-                size_semihard = torch.sum(cond_semihard)
-                idx_random_semihard = random.choice(range(size_semihard))
+        # Mine one positive and one semi-hard negative per anchor on the device...
+        idx_pos, idx_neg, dist_pos_list, dist_neg_list = \
+            self.mine_semi_hard(batch_embs, batch_labels.to(batch_embs.device))
 
-                # Fetch the batch index of the example and its distance w.r.t the anchor...
-                batch_idx_neg = idx_neg_list [cond_semihard][idx_random_semihard]
-                dist_neg      = dist_neg_list[cond_semihard][idx_random_semihard]
+        # Track triplets, each anchored at its own batch index...
+        triplets = list(zip(range(batch_size), idx_pos.tolist(), idx_neg.tolist()))
+        dist_log = list(zip(dist_pos_list.tolist(), dist_neg_list.tolist()))
 
-            # Otherwise, randomly select one negative example???
-            else:
-                idx_reduced   = random.choice(range(len(idx_neg_list)))
-                batch_idx_neg = idx_neg_list[idx_reduced]
-                dist_neg      = dist_neg_list[idx_reduced]
-
-            # Track triplet...
-            triplets.append((batch_idx_achr, batch_idx_pos, batch_idx_neg.tolist()))
-            dist_log.append((dist_pos, dist_neg))
-
-        if shuffle: 
+        if shuffle:
             idx_shuffle_list = random.sample(range(len(triplets)), k = len(triplets))
             triplets = [ triplets[i] for i in idx_shuffle_list ]
             dist_log = [ dist_log[i] for i in idx_shuffle_list ]
@@ -269,6 +245,52 @@ class OnlineSiameseModel(nn.Module):
         return triplets
 
 
+    def mine_semi_hard(self, batch_embs, batch_labels):
+        ''' Select one random positive and one random semi-hard negative per
+            anchor straight from the live embeddings, without a Python loop
+            over anchors.
+
+            A negative is semi-hard when dist_pos < dist_neg < dist_pos +
+            alpha; anchors without a semi-hard candidate fall back to a
+            uniformly random negative.  Returns per-anchor tensors
+            (idx_pos, idx_neg, dist_pos, dist_neg).
+        '''
+        batch_size = batch_embs.shape[0]
+
+        # Squared distances between every pair of embeddings...
+        dmat = calc_dmat(batch_embs, batch_embs, is_sqrt = False)
+
+        # Same-label mask; the anchor itself counts as a valid positive...
+        bmat = batch_labels[:, None] == batch_labels[None, :]
+
+        # Random scores drive the row-wise random pick: argmax over masked
+        # uniform scores selects uniformly among the mask's true entries
+        score = torch.rand(batch_size, batch_size, device = batch_embs.device)
+
+        # Pick one random positive per anchor...
+        idx_pos  = torch.argmax(score * bmat, dim = -1)
+        dist_pos = dmat.gather(-1, idx_pos[:, None]).squeeze(-1)
+
+        # Find semi-hard negatives satisfying dist_pos < dist_neg < dist_pos + alpha...
+        nmat = ~bmat
+
+        # A single-label batch leaves a row of nmat all False and argmax
+        # would silently pick a same-label "negative"; fail loudly instead
+        assert torch.all(torch.any(nmat, dim = -1)), \
+               "Every anchor needs at least one negative in the batch!!!  Found a batch with only one label."
+
+        cond_semihard = nmat * (dist_pos[:, None] < dmat) * (dmat < dist_pos[:, None] + self.alpha)
+
+        # Pick among semi-hard candidates, falling back to any negative...
+        has_semihard = torch.any(cond_semihard, dim = -1)
+        cond_select  = torch.where(has_semihard[:, None], cond_semihard, nmat)
+
+        idx_neg  = torch.argmax(score * cond_select, dim = -1)
+        dist_neg = dmat.gather(-1, idx_neg[:, None]).squeeze(-1)
+
+        return idx_pos, idx_neg, dist_pos, dist_neg
+
+
     def batch_hard(self, batch_imgs, batch_labels, batch_titles, **kwargs):
         # Get batch size...
         batch_size = len(batch_labels)
@@ -343,18 +365,24 @@ class SiameseModelCompare(nn.Module):
         batch_img_test  : torch tensor, (num_test_per_query, size_batch, size_image2d)
         '''
 
-        # Encode the query image...
-        # batch_emb_query : (num_test_per_query, size_batch, len_emb)
-        batch_emb_query = torch.stack( [ self.encoder.encode(each_img) for each_img in batch_img_query ] )
-
+        # Encode query and test images with one stacked encoder call...
+        # batch_emb_query : (num_query          , size_batch, len_emb)
         # batch_emb_test  : (num_test_per_query, size_batch, len_emb)
-        batch_emb_test = torch.stack( [ self.encoder.encode(each_img) for each_img in batch_img_test ] )
+        num_query, size_batch = batch_img_query.shape[:2]
+        num_test              = batch_img_test.shape[0]
+
+        img_stacked = torch.cat([ batch_img_query.flatten(0, 1), batch_img_test.flatten(0, 1) ], dim = 0)
+        emb_stacked = self.encoder.encode(img_stacked)
+
+        batch_emb_query = emb_stacked[ : num_query * size_batch ].view(num_query, size_batch, -1)
+        batch_emb_test  = emb_stacked[ num_query * size_batch : ].view(num_test , size_batch, -1)
 
         # Calculate the RMSD between two embds -- query and test...
-        # emb_diff     : (num_test_per_query, size_batch, len_emb)
+        # Expanded form qq + tt - 2qt avoids materializing the difference tensor
         # dist_squared : (num_test_per_query, size_batch, )
-        batch_emb_diff     = batch_emb_query - batch_emb_test
-        batch_dist_squared = torch.sum(batch_emb_diff * batch_emb_diff, dim = -1)
+        batch_dist_squared = ( torch.sum(batch_emb_query * batch_emb_query, dim = -1)
+                             + torch.sum(batch_emb_test  * batch_emb_test , dim = -1)
+                             - 2 * torch.sum(batch_emb_query * batch_emb_test, dim = -1) ).clamp_min(0)
 
         return batch_emb_query, batch_emb_test, batch_dist_squared
 
@@ -9,15 +9,19 @@ from torch.utils.data.dataloader import DataLoader
 import tqdm
 import numpy as np
 
+from deepprojection.utils import worker_init_fn
+
 logger = logging.getLogger(__name__)
 
 class ConfigTrainer:
-    path_chkpt   = None
-    num_workers  = 4
-    batch_size   = 64
-    max_epochs   = 10
-    lr           = 0.001
-    tqdm_disable = False
+    path_chkpt         = None
+    num_workers        = 4
+    batch_size         = 64
+    max_epochs         = 10
+    lr                 = 0.001
+    tqdm_disable       = False
+    persistent_workers = True
+    prefetch_factor    = 2
 
     def __init__(self, **kwargs):
         logger.info(f"___/ Configure Trainer \___")
@@ -27,11 +31,71 @@ class ConfigTrainer:
             logger.info(f"KV - {k:16s} : {v}")
 
 
+class CUDAPrefetcher:
+    ''' Iterate a dataloader while staging the next batch's host-to-device
+        copies on a side CUDA stream, so the transfer of batch N+1 overlaps
+        the compute of batch N.  Non-tensor entries (e.g. title strings) pass
+        through untouched.
+    '''
+
+    def __init__(self, loader, device):
+        self.loader = loader
+        self.device = device
+        self.stream = torch.cuda.Stream()
+
+        return None
+
+
+    def __len__(self):
+        return len(self.loader)
+
+
+    def _to_device(self, entry):
+        return tuple( item.to(self.device, non_blocking = True) if isinstance(item, torch.Tensor) \
+                      else item for item in entry )
+
+
+    def __iter__(self):
+        loader_iter = iter(self.loader)
+
+        # Stage the first batch on the side stream...
+        entry_next = next(loader_iter, None)
+        if entry_next is not None:
+            with torch.cuda.stream(self.stream):
+                entry_next = self._to_device(entry_next)
+
+        while entry_next is not None:
+            # Block the default stream until the staged copies land...
+            torch.cuda.current_stream().wait_stream(self.stream)
+            entry_current = entry_next
+
+            # Tie the staged tensors to the default stream so their memory
+            # isn't reclaimed while still in use
+            for item in entry_current:
+                if isinstance(item, torch.Tensor): item.record_stream(torch.cuda.current_stream())
+
+            # Stage the next batch while the current one computes...
+            entry_next = next(loader_iter, None)
+            if entry_next is not None:
+                with torch.cuda.stream(self.stream):
+                    entry_next = self._to_device(entry_next)
+
+            yield entry_current
+
+
+
+
 class Trainer:
     def __init__(self, model, dataset_train, config_train):
         self.model         = model
         self.dataset_train = dataset_train
         self.config_train  = config_train
+        self.loader_train  = None
+
+        # Scale losses so fp16 autocast gradients don't underflow; disabled
+        # on cpu where autocast is off and scaling is a no-op.  The scale
+        # state persists across epochs, hence one scaler per trainer
+        self.scaler = torch.cuda.amp.GradScaler(enabled = torch.cuda.is_available())
 
         # Load data to gpus if available
         self.device = 'cpu'
@@ -45,10 +109,36 @@ class Trainer:
     def save_checkpoint(self):
         # Hmmm, DataParallel wrappers keep raw model object in .module attribute
         model = self.model.module if hasattr(self.model, "module") else self.model
+        # torch.compile wraps too; unwrap so state_dict keys stay free of the
+        # _orig_mod prefix and checkpoints load into uncompiled models
+        model = getattr(model, '_orig_mod', model)
         logger.info(f"SAVE - {self.config_train.path_chkpt}")
         torch.save(model.state_dict(), self.config_train.path_chkpt)
 
 
+    def get_loader(self):
+        # Build the loader once and reuse it across epochs, otherwise
+        # persistent workers die with the discarded loader and dataset init
+        # (csv parse and psana datasource open) is repaid per epoch;
+        # prefetch_factor is only meaningful with at least one worker and
+        # stays small to bound the host memory held by prefetched batches
+        if self.loader_train is None:
+            config_train  = self.config_train
+            kwargs_worker = {}
+            if config_train.num_workers > 0:
+                kwargs_worker['persistent_workers'] = getattr(config_train, 'persistent_workers', True)
+                kwargs_worker['prefetch_factor'   ] = getattr(config_train, 'prefetch_factor'   , 2)
+
+            self.loader_train = DataLoader( self.dataset_train, shuffle        = config_train.shuffle,
+                                                                pin_memory     = config_train.pin_memory,
+                                                                batch_size     = config_train.batch_size,
+                                                                num_workers    = config_train.num_workers,
+                                                                worker_init_fn = worker_init_fn,
+                                                                **kwargs_worker )
+
+        return self.loader_train
+
+
     def train(self, is_save_checkpoint = True, epoch = None):
         """ The training loop.  """
 
@@ -60,11 +150,7 @@ class Trainer:
 
         # Train an epoch...
         model.train()
-        dataset_train = self.dataset_train
-        loader_train = DataLoader( dataset_train, shuffle     = config_train.shuffle, 
-                                                  pin_memory  = config_train.pin_memory, 
-                                                  batch_size  = config_train.batch_size,
-                                                  num_workers = config_train.num_workers )
+        loader_train = self.get_loader()
         losses_epoch = []
 
         # Train each batch...
@@ -76,15 +162,16 @@ class Trainer:
             for i in range(len(label_anchor)):
                 logger.info(f"DATA - {title_anchor[i]}, {title_pos[i]}, {title_neg[i]}")
 
-            img_anchor = img_anchor.to(self.device)
-            img_pos    = img_pos.to(self.device)
-            img_neg    = img_neg.to(self.device)
+            img_anchor = img_anchor.to(self.device, non_blocking = True)
+            img_pos    = img_pos.to(self.device, non_blocking = True)
+            img_neg    = img_neg.to(self.device, non_blocking = True)
 
             _, _, _, loss = self.model.forward(img_anchor, img_pos, img_neg)
 
             optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
+            self.scaler.scale(loss).backward()
+            self.scaler.step(optimizer)
+            self.scaler.update()
 
             loss_val = loss.cpu().detach().numpy()
             losses_epoch.append(loss_val)
@@ -105,6 +192,12 @@ class OnlineTrainer:
         self.model         = model
         self.dataset_train = dataset_train
         self.config_train  = config_train
+        self.loader_train  = None
+
+        # Scale losses so fp16 autocast gradients don't underflow; disabled
+        # on cpu where autocast is off and scaling is a no-op.  The scale
+        # state persists across epochs, hence one scaler per trainer
+        self.scaler = torch.cuda.amp.GradScaler(enabled = torch.cuda.is_available())
 
         # Load data to gpus if available
         self.device = 'cpu'
@@ -118,10 +211,36 @@ class OnlineTrainer:
     def save_checkpoint(self):
         # Hmmm, DataParallel wrappers keep raw model object in .module attribute
         model = self.model.module if hasattr(self.model, "module") else self.model
+        # torch.compile wraps too; unwrap so state_dict keys stay free of the
+        # _orig_mod prefix and checkpoints load into uncompiled models
+        model = getattr(model, '_orig_mod', model)
         logger.info(f"SAVE - {self.config_train.path_chkpt}")
         torch.save(model.state_dict(), self.config_train.path_chkpt)
 
 
+    def get_loader(self):
+        # Build the loader once and reuse it across epochs, otherwise
+        # persistent workers die with the discarded loader and dataset init
+        # (csv parse and psana datasource open) is repaid per epoch;
+        # prefetch_factor is only meaningful with at least one worker and
+        # stays small to bound the host memory held by prefetched batches
+        if self.loader_train is None:
+            config_train  = self.config_train
+            kwargs_worker = {}
+            if config_train.num_workers > 0:
+                kwargs_worker['persistent_workers'] = getattr(config_train, 'persistent_workers', True)
+                kwargs_worker['prefetch_factor'   ] = getattr(config_train, 'prefetch_factor'   , 2)
+
+            self.loader_train = DataLoader( self.dataset_train, shuffle        = config_train.shuffle,
+                                                                pin_memory     = config_train.pin_memory,
+                                                                batch_size     = config_train.batch_size,
+                                                                num_workers    = config_train.num_workers,
+                                                                worker_init_fn = worker_init_fn,
+                                                                **kwargs_worker )
+
+        return self.loader_train
+
+
     def train(self, is_save_checkpoint = True, epoch = None):
         """ The training loop.  """
 
@@ -133,18 +252,17 @@ class OnlineTrainer:
 
         # Train an epoch...
         model.train()
-        dataset_train = self.dataset_train
-        loader_train = DataLoader( dataset_train, shuffle     = config_train.shuffle, 
-                                                  pin_memory  = config_train.pin_memory, 
-                                                  batch_size  = config_train.batch_size,
-                                                  num_workers = config_train.num_workers )
+        loader_train = self.get_loader()
         losses_epoch = []
 
+        # Overlap host-to-device copies with compute when a GPU is in use...
+        loader_iter = CUDAPrefetcher(loader_train, self.device) if torch.cuda.is_available() else loader_train
+
         # Train each batch...
-        batch = tqdm.tqdm(enumerate(loader_train), total = len(loader_train), disable = config_train.tqdm_disable)
+        batch = tqdm.tqdm(enumerate(loader_iter), total = len(loader_train), disable = config_train.tqdm_disable)
         for step_id, entry in batch:
             batch_imgs, batch_labels, batch_titles = entry
-            batch_imgs = batch_imgs.to(self.device)
+            batch_imgs = batch_imgs.to(self.device, non_blocking = True)
 
             loss = self.model.forward(batch_imgs, batch_labels, batch_titles, 
                                       is_logging = config_train.is_logging, 
@@ -152,8 +270,9 @@ class OnlineTrainer:
                                       shuffle    = config_train.online_shuffle,)
 
             optimizer.zero_grad()
-            loss.backward()
-            optimizer.step()
+            self.scaler.scale(loss).backward()
+            self.scaler.step(optimizer)
+            self.scaler.update()
 
             loss_val = loss.cpu().detach().numpy()
             losses_epoch.append(loss_val)
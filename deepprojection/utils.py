@@ -22,6 +22,27 @@ def set_seed(seed):
 
 
 
+def worker_init_fn(worker_id):
+    ''' Give each dataloader worker an independent random stream.
+
+        Reusing one seed across workers makes every worker draw the same
+        random numbers, so per-worker sampling would fetch duplicates.  The
+        dataset seed (when given) is offset by the worker id to keep runs
+        reproducible while streams stay independent.
+    '''
+    worker_info = torch.utils.data.get_worker_info()
+    dataset     = worker_info.dataset
+
+    seed = getattr(dataset, 'seed', None)
+    seed_worker = worker_info.seed if seed is None else seed + worker_id
+
+    dataset.rng = np.random.default_rng(seed_worker)
+
+    return None
+
+
+
+
 class EpochManager:
 
     def __init__(self, trainer, validator, max_epochs = 1):
@@ -8,15 +8,19 @@ from torch.utils.data.dataloader import DataLoader
 import tqdm
 import numpy as np
 
+from deepprojection.utils import worker_init_fn
+
 logger = logging.getLogger(__name__)
 
 class ConfigValidator:
-    path_chkpt   = None
-    num_workers  = 4
-    batch_size   = 64
-    max_epochs   = 10
-    lr           = 0.001
-    tqdm_disable = False
+    path_chkpt         = None
+    num_workers        = 4
+    batch_size         = 64
+    max_epochs         = 10
+    lr                 = 0.001
+    tqdm_disable       = False
+    persistent_workers = True
+    prefetch_factor    = 2
 
     def __init__(self, **kwargs):
         logger.info(f"__/ Configure Validator \___")
@@ -33,6 +37,7 @@ class LossValidator:
         self.model        = model
         self.dataset_test = dataset_test
         self.config_test  = config_test
+        self.loader_test  = None
 
         # Load data to gpus if available...
         self.device = 'cpu'
@@ -46,6 +51,27 @@ class LossValidator:
         return None
 
 
+    def get_loader(self):
+        # Build the loader once and reuse it across epochs so persistent
+        # workers survive between validate calls; see the matching note in
+        # trainer.py...
+        if self.loader_test is None:
+            config_test   = self.config_test
+            kwargs_worker = {}
+            if config_test.num_workers > 0:
+                kwargs_worker['persistent_workers'] = getattr(config_test, 'persistent_workers', True)
+                kwargs_worker['prefetch_factor'   ] = getattr(config_test, 'prefetch_factor'   , 2)
+
+            self.loader_test = DataLoader( self.dataset_test, shuffle        = config_test.shuffle,
+                                                              pin_memory     = config_test.pin_memory,
+                                                              batch_size     = config_test.batch_size,
+                                                              num_workers    = config_test.num_workers,
+                                                              worker_init_fn = worker_init_fn,
+                                                              **kwargs_worker )
+
+        return self.loader_test
+
+
     def validate(self, is_return_loss = False, epoch = None):
         """ The testing loop.  """
 
@@ -55,11 +81,7 @@ class LossValidator:
         # Validate an epoch...
         # Load model state...
         model.eval()
-        dataset_test = self.dataset_test
-        loader_test  = DataLoader( dataset_test, shuffle     = config_test.shuffle, 
-                                                 pin_memory  = config_test.pin_memory, 
-                                                 batch_size  = config_test.batch_size,
-                                                 num_workers = config_test.num_workers )
+        loader_test = self.get_loader()
 
         # Train each batch...
         losses_epoch = []
@@ -70,9 +92,9 @@ class LossValidator:
             img_anchor, img_pos, img_neg, label_anchor, \
             title_anchor, title_pos, title_neg = entry
 
-            img_anchor = img_anchor.to(self.device)
-            img_pos    = img_pos.to(self.device)
-            img_neg    = img_neg.to(self.device)
+            img_anchor = img_anchor.to(self.device, non_blocking = True)
+            img_pos    = img_pos.to(self.device, non_blocking = True)
+            img_neg    = img_neg.to(self.device, non_blocking = True)
 
             for i in range(len(label_anchor)):
                 logger.info(f"DATA - {title_anchor[i]}, {title_pos[i]}, {title_neg[i]}")
@@ -99,6 +121,7 @@ class OnlineLossValidator:
         self.model        = model
         self.dataset_test = dataset_test
         self.config_test  = config_test
+        self.loader_test  = None
 
         # Load data to gpus if available...
         self.device = 'cpu'
@@ -112,6 +135,27 @@ class OnlineLossValidator:
         return None
 
 
+    def get_loader(self):
+        # Build the loader once and reuse it across epochs so persistent
+        # workers survive between validate calls; see the matching note in
+        # trainer.py...
+        if self.loader_test is None:
+            config_test   = self.config_test
+            kwargs_worker = {}
+            if config_test.num_workers > 0:
+                kwargs_worker['persistent_workers'] = getattr(config_test, 'persistent_workers', True)
+                kwargs_worker['prefetch_factor'   ] = getattr(config_test, 'prefetch_factor'   , 2)
+
+            self.loader_test = DataLoader( self.dataset_test, shuffle        = config_test.shuffle,
+                                                              pin_memory     = config_test.pin_memory,
+                                                              batch_size     = config_test.batch_size,
+                                                              num_workers    = config_test.num_workers,
+                                                              worker_init_fn = worker_init_fn,
+                                                              **kwargs_worker )
+
+        return self.loader_test
+
+
     def validate(self, is_return_loss = False, epoch = None):
         """ The testing loop.  """
 
@@ -121,11 +165,7 @@ class OnlineLossValidator:
         # Validate an epoch...
         # Load model state...
         model.eval()
-        dataset_test = self.dataset_test
-        loader_test  = DataLoader( dataset_test, shuffle     = config_test.shuffle, 
-                                                 pin_memory  = config_test.pin_memory, 
-                                                 batch_size  = config_test.batch_size,
-                                                 num_workers = config_test.num_workers )
+        loader_test = self.get_loader()
 
         # Train each batch...
         losses_epoch = []
@@ -134,7 +174,7 @@ class OnlineLossValidator:
             losses_batch = []
 
             batch_imgs, batch_labels, batch_titles = entry
-            batch_imgs = batch_imgs.to(self.device)
+            batch_imgs = batch_imgs.to(self.device, non_blocking = True)
 
             with torch.no_grad():
                 loss = self.model.forward(batch_imgs, batch_labels, batch_titles, 
@@ -196,8 +236,8 @@ class PairValidator:
 
             img_anchor, img_second, label_anchor, title_anchor, title_second = entry
 
-            img_anchor = img_anchor.to(self.device)
-            img_second = img_second.to(self.device)
+            img_anchor = img_anchor.to(self.device, non_blocking = True)
+            img_second = img_second.to(self.device, non_blocking = True)
 
             with torch.no_grad():
                 # Look at each example in a batch...
@@ -268,8 +308,8 @@ class MultiwayQueryValidator:
             batch_str_query, batch_str_test = batch_str_list[0:1], batch_str_list[1:]
 
             # Load imgs to gpu...
-            batch_img_query = torch.stack(batch_img_query).to(self.device)
-            batch_img_test  = torch.stack(batch_img_test).to(self.device)
+            batch_img_query = torch.stack(batch_img_query).to(self.device, non_blocking = True)
+            batch_img_test  = torch.stack(batch_img_test).to(self.device, non_blocking = True)
 
             # Calculate the squared distance between embeddings...
             # (size_batch, size_image) => (size_batch, len_emb)
@@ -348,7 +388,7 @@ class EmbeddingCalculator:
 
             # Load imgs to gpu...
             # batch_img : torch.Tensor, (size_batch, size_image2d)
-            batch_img = batch_img.to(self.device)
+            batch_img = batch_img.to(self.device, non_blocking = True)
 
             with torch.no_grad():
                 # Calculate image embedding for this batch...
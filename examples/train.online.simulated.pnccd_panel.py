@@ -153,6 +153,10 @@ def init_weights(module):
         module.weight.data.normal_(mean = 0.0, std = 0.02)
 model.apply(init_weights)
 
+# Fuse the encoder + distance graph when torch.compile is available (PyTorch 2.x)...
+if hasattr(torch, 'compile'):
+    model = torch.compile(model, mode = 'reduce-overhead', fullgraph = False)
+
 
 # [[[ CHECKPOINT ]]]
 DRCCHKPT         = "chkpts"
@@ -163,31 +167,35 @@ path_chkpt       = os.path.join(prefixpath_chkpt, fl_chkpt)
 
 # [[[ TRAINER ]]]
 # Config the trainer...
-config_train = ConfigTrainer( path_chkpt     = path_chkpt,
-                              num_workers    = 1,
-                              batch_size     = size_batch,
-                              pin_memory     = True,
-                              shuffle        = False,
-                              online_shuffle = online_shuffle,
-                              is_logging     = False,
-                              method         = 'random-semi-hard',
-                              lr             = lr, )
+config_train = ConfigTrainer( path_chkpt         = path_chkpt,
+                              num_workers        = 1,
+                              persistent_workers = True,
+                              prefetch_factor    = 2,
+                              batch_size         = size_batch,
+                              pin_memory         = True,
+                              shuffle            = False,
+                              online_shuffle     = online_shuffle,
+                              is_logging         = False,
+                              method             = 'random-semi-hard',
+                              lr                 = lr, )
 
 # Training...
 trainer = OnlineTrainer(model, dataset_train, config_train)
 
 
 # [[[ VALIDATOR ]]]
-config_validator = ConfigValidator( path_chkpt     = None,
-                                    num_workers    = 1,
-                                    batch_size     = size_batch,
-                                    pin_memory     = True,
-                                    shuffle        = False,
-                                    online_shuffle = online_shuffle,
-                                    is_logging     = False,
-                                    method         = 'random-semi-hard',
-                                    lr             = lr, 
-                                    isflat         = False, )  # Conv2d input needs one more dim for batch
+config_validator = ConfigValidator( path_chkpt         = None,
+                                    num_workers        = 1,
+                                    persistent_workers = True,
+                                    prefetch_factor    = 2,
+                                    batch_size         = size_batch,
+                                    pin_memory         = True,
+                                    shuffle            = False,
+                                    online_shuffle     = online_shuffle,
+                                    is_logging         = False,
+                                    method             = 'random-semi-hard',
+                                    lr                 = lr, 
+                                    isflat             = False, )  # Conv2d input needs one more dim for batch
 
 validator = OnlineLossValidator(model, dataset_validate, config_validator)
 